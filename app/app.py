@@ -1,13 +1,17 @@
 import os
+import time
 import yaml
+import signal
 import shutil
 import httpx
 import uvicorn
 import asyncio
+from inbox import Inbox
 from utils import Utils
 from pathlib import Path
 from loguru import logger
 from trainer import Trainer
+from profiler import Profiler
 from pydantic import BaseModel
 from kidfinder import KidFinder
 from fastapi_cache import FastAPICache
@@ -26,6 +30,12 @@ from fastapi import FastAPI, Request, HTTPException, Depends, Header, UploadFile
 async def lifespan(app: FastAPI):
     # Startup: initialize the in-memory cache.
     FastAPICache.init(InMemoryBackend(), prefix="fastapi-cache")
+    # Profiler signals are handled by the event loop rather than interrupting it.
+    # SIGUSR1 profiles the next PROFILER_SIGNAL_INFERENCES inferences, SIGUSR2 the next training run.
+    if hasattr(signal, "SIGUSR1"):
+        loop = asyncio.get_running_loop()
+        loop.add_signal_handler(signal.SIGUSR1, profiler.arm, profiler_signal_inferences)
+        loop.add_signal_handler(signal.SIGUSR2, profiler.arm, 0, True)
     yield
     # Shutdown: perform any cleanup if required (none needed here).
   
@@ -41,8 +51,15 @@ app.mount("/images/trainer", StaticFiles(directory=os.path.join("images", "train
 templates = Jinja2Templates(directory="templates")
 
 # Rekognition classes
-trainer = Trainer()
-finder = KidFinder()
+profiler = Profiler()
+trainer = Trainer(profiler=profiler)
+finder = KidFinder(profiler=profiler)
+profiler_signal_inferences = int(os.getenv("PROFILER_SIGNAL_INFERENCES", 10))
+
+# Durable queue between the WhatsApp bot and face recognition
+inbox = Inbox()
+inbox_poll_interval = float(os.getenv("INBOX_POLL_INTERVAL", 1))
+inbox_prune_interval = 3600
 
 
 
@@ -53,19 +70,54 @@ class ErrorResponse(BaseModel):
 
 @bot.router.message()
 def message_handler(notification: Notification) -> None:
-    utils.get_message_data(notification.event)
+    # Only persist the notification here, processing happens in the inbox worker.
+    if notification.event.get("messageData", {}).get("typeMessage") == "imageMessage":
+        inbox.put(notification.event)
+
+
+def process_message(event) -> None:
+    utils.get_message_data(event)
     if utils.is_image:
         collection_id = utils.get_collection_id()
         if collection_id is not None:
             if utils.download_image(collection_id):
-                success, max_probability = finder.find(query_image=utils.download_path, collection_id=collection_id)
+                try:
+                    success, max_probability = finder.find(query_image=utils.download_path, collection_id=collection_id)
+                finally:
+                    os.remove(utils.download_path)
                 if success:
                     logger.info(f"{collection_id} was detected in the image.")
-                    notification.api.sending.forwardMessages(utils.config.get("target"),utils.chat_id,[utils.message_id])
-                    
+                    bot.api.sending.forwardMessages(utils.config.get("target"),utils.chat_id,[utils.message_id])
                 else:
                     logger.info(f"{collection_id} was not detected in the image.")
-                os.remove(utils.download_path)    
+                inbox.complete(utils.message_id, verdict=success, probability=max_probability)
+                return
+    inbox.complete(event.get("idMessage"))
+
+
+def inbox_worker() -> None:
+    inbox.recover()
+    last_prune = 0.0
+    while True:
+        try:
+            if time.time() - last_prune > inbox_prune_interval:
+                pruned = inbox.prune()
+                if pruned:
+                    logger.info(f"Pruned {pruned} messages from inbox.")
+                last_prune = time.time()
+            event = inbox.claim()
+            if event is None:
+                time.sleep(inbox_poll_interval)
+                continue
+            try:
+                process_message(event)
+            except Exception as e:
+                logger.error(f"Error processing message {event.get('idMessage')}: {e}")
+                inbox.fail(event.get("idMessage"), str(e))
+        except Exception as e:
+            # Keep the worker alive on inbox errors (e.g. disk full) and try again later.
+            logger.error(f"Inbox worker error: {e}")
+            time.sleep(inbox_poll_interval)
 
 
 @app.post("/train", response_class=JSONResponse)
@@ -227,6 +279,35 @@ async def get_collections():
     ]
     return {"collections": collection_ids}
 
+@app.post("/profiler", response_class=JSONResponse)
+async def arm_profiler(inferences: int = Form(0), training: bool = Form(False)):
+    """
+    Profile the next inferences and/or the next training run.
+
+    - **inferences**: Number of upcoming inferences to profile.
+    - **training**: Whether to profile the next training run.
+    """
+    return {"armed": profiler.arm(inferences=inferences, training=training)}
+
+@app.get("/profiler", response_class=JSONResponse)
+async def get_profiler():
+    """
+    Return the armed profiler counters and the artifacts in the profiles folder.
+    """
+    return profiler.status()
+
+@app.delete("/profiler", response_class=JSONResponse)
+async def disarm_profiler():
+    profiler.disarm()
+    return profiler.status()
+
+@app.get("/inbox", response_class=JSONResponse)
+async def get_inbox():
+    """
+    Return the number of inbox messages per status (pending, processing, done, failed).
+    """
+    return {"inbox": inbox.stats()}
+
 # Asynchronous wrapper to run the FastAPI server
 async def start_fastapi():
     logger.debug("Starting Web Server")
@@ -241,11 +322,17 @@ async def start_whatsapp_bot():
     logger.debug("Startting Whatsapp Bot")
     await asyncio.to_thread(bot.run_forever)
 
-# Main entry point to run both services concurrently
+# Asynchronous wrapper to run the inbox worker in a thread.
+async def start_inbox_worker():
+    logger.debug("Starting Inbox Worker")
+    await asyncio.to_thread(inbox_worker)
+
+# Main entry point to run all services concurrently
 async def main():
     await asyncio.gather(
         start_fastapi(),
-        start_whatsapp_bot()
+        start_whatsapp_bot(),
+        start_inbox_worker()
     )
 
 if __name__=="__main__":
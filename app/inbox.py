@@ -0,0 +1,203 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from pathlib import Path
+from loguru import logger
+from typing import Dict, Any, Optional
+
+
+class Inbox:
+    """
+    Durable on-disk queue sitting between the WhatsApp bot and face recognition.
+    Incoming notifications are persisted to a SQLite database (WAL mode) keyed by
+    idMessage, so they survive restarts and bursts and are processed at least once.
+    Failed messages are retried with exponential backoff until INBOX_MAX_ATTEMPTS is reached.
+    Verdicts of processed messages are kept for a retention period and then pruned.
+    """
+    PENDING = "pending"
+    PROCESSING = "processing"
+    DONE = "done"
+    FAILED = "failed"
+
+    def __init__(self):
+        self.inbox_path = Path.cwd() / "inbox"
+        self.inbox_path.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.inbox_path / "inbox.db"
+        self.batch_size = int(os.getenv("INBOX_BATCH_SIZE", 1))
+        self.max_attempts = int(os.getenv("INBOX_MAX_ATTEMPTS", 5))
+        self.retry_delay = float(os.getenv("INBOX_RETRY_DELAY", 30))
+        self.retention_hours = float(os.getenv("INBOX_RETENTION_HOURS", 72))
+        self._lock = threading.Lock()
+        self._uncommitted = 0
+        self._connection = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS messages (
+                id_message TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                verdict INTEGER,
+                probability REAL,
+                error TEXT,
+                received_at REAL NOT NULL,
+                processed_at REAL,
+                next_attempt_at REAL NOT NULL DEFAULT 0
+            )
+            """
+        )
+        # Inboxes created before retries had a backoff lack the next_attempt_at column.
+        columns = [row["name"] for row in self._connection.execute("PRAGMA table_info(messages)")]
+        if "next_attempt_at" not in columns:
+            self._connection.execute("ALTER TABLE messages ADD COLUMN next_attempt_at REAL NOT NULL DEFAULT 0")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS idx_messages_status ON messages (status, received_at)")
+        self._connection.commit()
+
+    def put(self, event: Dict[str, Any]) -> bool:
+        """
+        Persist an incoming notification.
+
+        Writes are committed every INBOX_BATCH_SIZE messages (default 1, i.e. every
+        message is on disk before it is acknowledged). Larger batches trade a small
+        loss window for throughput during bursts; pending writes are also committed
+        whenever a message is claimed.
+
+        Args:
+            event (Dict[str, Any]): The raw notification event
+
+        Returns:
+            bool: True if the message was queued, False if it was already known
+        """
+        id_message = event.get("idMessage")
+        if not id_message:
+            logger.warning("Dropping notification without idMessage")
+            return False
+        with self._lock:
+            cursor = self._connection.execute(
+                "INSERT OR IGNORE INTO messages (id_message, payload, status, received_at) VALUES (?, ?, ?, ?)",
+                (id_message, json.dumps(event), self.PENDING, time.time())
+            )
+            self._uncommitted += 1
+            if self._uncommitted >= self.batch_size:
+                self._commit()
+        if cursor.rowcount == 0:
+            logger.info(f"Message {id_message} already in inbox, skipping.")
+            return False
+        return True
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """
+        Mark the oldest pending message that is due for an attempt as processing.
+        Messages are claimed one at a time so a crash is only charged to the
+        message that was actually being processed.
+
+        Returns:
+            Optional[Dict[str, Any]]: The message event, or None if nothing is due
+        """
+        with self._lock:
+            self._commit()
+            row = self._connection.execute(
+                "SELECT id_message, payload FROM messages WHERE status = ? AND next_attempt_at <= ? ORDER BY received_at LIMIT 1",
+                (self.PENDING, time.time())
+            ).fetchone()
+            if row is None:
+                return None
+            self._connection.execute(
+                "UPDATE messages SET status = ?, attempts = attempts + 1 WHERE id_message = ?",
+                (self.PROCESSING, row["id_message"])
+            )
+            self._connection.commit()
+        return json.loads(row["payload"])
+
+    def complete(self, id_message: str, verdict: Optional[bool] = None, probability: Optional[float] = None) -> None:
+        """
+        Record the verdict of a processed message.
+        """
+        with self._lock:
+            self._connection.execute(
+                "UPDATE messages SET status = ?, verdict = ?, probability = ?, error = NULL, processed_at = ? WHERE id_message = ?",
+                (self.DONE, None if verdict is None else int(verdict),
+                 None if probability is None else float(probability), time.time(), id_message)
+            )
+            self._connection.commit()
+
+    def fail(self, id_message: str, error: str) -> None:
+        """
+        Return a message to the queue, or mark it failed once INBOX_MAX_ATTEMPTS is reached.
+        The next attempt is delayed by INBOX_RETRY_DELAY seconds, doubled after every attempt.
+        """
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "UPDATE messages SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END, error = ?, processed_at = ?, "
+                "next_attempt_at = ? + ? * (1 << (attempts - 1)) WHERE id_message = ?",
+                (self.max_attempts, self.FAILED, self.PENDING, error, now, now, self.retry_delay, id_message)
+            )
+            self._connection.commit()
+
+    def recover(self) -> int:
+        """
+        Return messages left in processing by a previous run to the queue.
+        Messages that already used INBOX_MAX_ATTEMPTS (e.g. an image that keeps
+        crashing the process) are marked failed instead of being replayed.
+        Should be called once at startup, before any worker claims messages.
+
+        Returns:
+            int: Number of messages that will be replayed
+        """
+        with self._lock:
+            crashed = [row["id_message"] for row in self._connection.execute(
+                "SELECT id_message FROM messages WHERE status = ? AND attempts >= ?",
+                (self.PROCESSING, self.max_attempts)
+            )]
+            self._connection.execute(
+                "UPDATE messages SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END, "
+                "error = CASE WHEN attempts >= ? THEN ? ELSE error END, processed_at = ? WHERE status = ?",
+                (self.max_attempts, self.FAILED, self.PENDING,
+                 self.max_attempts, "Interrupted while processing", time.time(), self.PROCESSING)
+            )
+            self._connection.commit()
+            pending = self._connection.execute(
+                "SELECT COUNT(*) FROM messages WHERE status = ?", (self.PENDING,)
+            ).fetchone()[0]
+        for id_message in crashed:
+            logger.error(f"Message {id_message} was interrupted {self.max_attempts} times, marking it as failed.")
+        if pending:
+            logger.info(f"Replaying {pending} unprocessed messages from inbox.")
+        return pending
+
+    def prune(self) -> int:
+        """
+        Delete done and failed messages older than INBOX_RETENTION_HOURS.
+
+        Returns:
+            int: Number of deleted messages
+        """
+        cutoff = time.time() - self.retention_hours * 3600
+        with self._lock:
+            cursor = self._connection.execute(
+                "DELETE FROM messages WHERE status IN (?, ?) AND processed_at < ?",
+                (self.DONE, self.FAILED, cutoff)
+            )
+            self._connection.commit()
+        return cursor.rowcount
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return the number of messages per status.
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT status, COUNT(*) AS count FROM messages GROUP BY status"
+            ).fetchall()
+        return {row["status"]: row["count"] for row in rows}
+
+    def _commit(self) -> None:
+        if self._uncommitted:
+            self._connection.commit()
+            self._uncommitted = 0
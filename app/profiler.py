@@ -0,0 +1,174 @@
+import os
+import io
+import json
+import time
+import pstats
+import cProfile
+import threading
+import tracemalloc
+from pathlib import Path
+from datetime import datetime
+from loguru import logger
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Any
+
+
+class Profiler:
+    """
+    Opt-in profiler for the inference and training paths.
+    Once armed (through the /profiler endpoint or a signal) the next N inferences
+    and/or the next training run are captured with cProfile, together with the
+    tracemalloc peak allocation of every stage. Artifacts are written to the
+    "profiles" folder, which keeps only the most recent PROFILER_MAX_ARTIFACTS runs.
+    Both are process-wide: on Python 3.12+ cProfile records calls from every thread,
+    and tracemalloc counts allocations made meanwhile by other threads (bot polling,
+    web server, inbox worker). Look for the KidFinder/Trainer call tree in the .prof
+    output, and treat memory peaks as an upper bound.
+    When not armed, session() and stage() return a shared no-op context.
+    """
+    INFERENCE = "inference"
+    TRAINING = "training"
+
+    def __init__(self):
+        self.profiles_path = Path.cwd() / "profiles"
+        self.max_artifacts = int(os.getenv("PROFILER_MAX_ARTIFACTS", 20))
+        self._armed: Dict[str, int] = {self.INFERENCE: 0, self.TRAINING: 0}
+        self._lock = threading.Lock()
+        # Only one cProfile session can be active in the process at a time.
+        self._running = threading.Lock()
+        # Stage timings of the run in progress, kept on the thread that runs it.
+        self._local = threading.local()
+        self._null = nullcontext()
+
+    def arm(self, inferences: int = 0, training: bool = False) -> Dict[str, int]:
+        """
+        Profile the next `inferences` inferences and, if `training` is set, the next training run.
+
+        Returns:
+            Dict[str, int]: The number of runs still armed per kind
+        """
+        with self._lock:
+            self._armed[self.INFERENCE] += max(int(inferences), 0)
+            if training:
+                self._armed[self.TRAINING] = 1
+            logger.info(f"Profiler armed: {self._armed}")
+            return dict(self._armed)
+
+    def disarm(self) -> None:
+        with self._lock:
+            self._armed = {self.INFERENCE: 0, self.TRAINING: 0}
+
+    def status(self) -> Dict[str, Any]:
+        """
+        Return the armed counters and the list of artifacts currently on disk.
+        """
+        artifacts = sorted(p.name for p in self.profiles_path.glob("*.prof")) if self.profiles_path.exists() else []
+        with self._lock:
+            return {"armed": dict(self._armed), "artifacts": artifacts}
+
+    def session(self, kind: str):
+        """
+        Context manager wrapping one inference or training run.
+        Profiles the run if `kind` is armed, otherwise does nothing.
+        """
+        if not self._armed[kind]:
+            return self._null
+        return self._session(kind)
+
+    def stage(self, name: str):
+        """
+        Context manager recording duration and tracemalloc peak of a stage
+        inside an active session, otherwise does nothing.
+        """
+        if getattr(self._local, "stages", None) is None:
+            return self._null
+        return self._stage(name)
+
+    @contextmanager
+    def _session(self, kind: str):
+        with self._lock:
+            take = self._armed[kind] > 0 and self._running.acquire(blocking=False)
+            if take:
+                self._armed[kind] -= 1
+        if not take:
+            yield
+            return
+
+        started_tracing = False
+        profile = cProfile.Profile()
+        try:
+            try:
+                started_tracing = not tracemalloc.is_tracing()
+                if started_tracing:
+                    tracemalloc.start()
+                tracemalloc.reset_peak()
+                start_memory = tracemalloc.get_traced_memory()[0]
+                self._local.stages = {}
+                start = time.perf_counter()
+                profile.enable()
+            except Exception as e:
+                # e.g. another profiler or debugger already uses sys.monitoring.
+                logger.error(f"Unable to start profiler: {e}")
+                profile = None
+            yield
+        finally:
+            summary = None
+            if profile is not None:
+                profile.disable()
+                duration = time.perf_counter() - start
+                stages = self._local.stages
+                # Stages reset the tracemalloc peak, so the run peak is the largest seen.
+                peak = max([tracemalloc.get_traced_memory()[1]] + [s["peak_bytes_absolute"] for s in stages.values()])
+                summary = {
+                    "kind": kind,
+                    "duration_seconds": duration,
+                    "peak_bytes": peak - start_memory,
+                    "peak_bytes_absolute": peak,
+                    "stages": stages
+                }
+            self._local.stages = None
+            if started_tracing:
+                tracemalloc.stop()
+            self._running.release()
+            if summary is not None:
+                try:
+                    self._write(kind, profile, summary)
+                except Exception as e:
+                    logger.error(f"Unable to write profiler artifacts: {e}")
+
+    @contextmanager
+    def _stage(self, name: str):
+        tracemalloc.reset_peak()
+        start_memory = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            if self._local.stages is not None:
+                peak = tracemalloc.get_traced_memory()[1]
+                # peak_bytes is what the stage allocated on top of the memory already in use.
+                self._local.stages[name] = {
+                    "duration_seconds": time.perf_counter() - start,
+                    "peak_bytes": peak - start_memory,
+                    "peak_bytes_absolute": peak
+                }
+
+    def _write(self, kind: str, profile: cProfile.Profile, summary: Dict[str, Any]) -> None:
+        self.profiles_path.mkdir(parents=True, exist_ok=True)
+        base = self.profiles_path / f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{kind}"
+        profile.dump_stats(f"{base}.prof")
+
+        # Human-readable top functions next to the raw stats.
+        stream = io.StringIO()
+        pstats.Stats(profile, stream=stream).sort_stats("cumulative").print_stats(30)
+        summary["top_functions"] = stream.getvalue()
+        with open(f"{base}.json", "w") as file:
+            json.dump(summary, file, indent=2)
+        logger.info(f"Profiled {kind} in {summary['duration_seconds']:.2f}s, artifacts saved to {base}.prof")
+        self._rotate()
+
+    def _rotate(self) -> None:
+        runs = sorted(self.profiles_path.glob("*.prof"))
+        for old in runs[:-self.max_artifacts]:
+            old.unlink(missing_ok=True)
+            old.with_suffix(".json").unlink(missing_ok=True)
@@ -5,7 +5,8 @@ from pathlib import Path
 from loguru import logger
 from sklearn.svm import SVC
 from deepface import DeepFace
-from typing import List, Dict, Any
+from profiler import Profiler
+from typing import List, Dict, Any, Optional
 
 
 
@@ -14,7 +15,8 @@ class Trainer:
     Handles face embedding extraction and one-vs-all classifier training
     for each identity. The classifiers are stored in the "classifiers" folder.
     """
-    def __init__(self):
+    def __init__(self, profiler: Optional[Profiler] = None):
+        self.profiler = profiler or Profiler()
         # Define and create the dataset directory and classifiers output folder.
         self.dataset_dir = Path.cwd() / "images" / "trainer"
         self.dataset_dir.mkdir(parents=True, exist_ok=True)
@@ -90,8 +92,11 @@ class Trainer:
 
     def train(self):
         try:
-            embeddings, labels = self.load_dataset()
-            self.train_per_face_classifiers(embeddings, labels)
+            with self.profiler.session(Profiler.TRAINING):
+                with self.profiler.stage("load_dataset"):
+                    embeddings, labels = self.load_dataset()
+                with self.profiler.stage("train_per_face_classifiers"):
+                    self.train_per_face_classifiers(embeddings, labels)
             return True
         except Exception as e:
             logger.error(str(e))
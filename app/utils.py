@@ -59,8 +59,8 @@ class Utils:
         self.sender_id = self.sender.get('sender')
         
         # Check if message contains an image
-        if self.message_type == 'imageMessage':
-            self.is_image = True
+        self.is_image = self.message_type == 'imageMessage'
+        if self.is_image:
             self.file_data = message.get('messageData', {}).get('fileMessageData', {})
             self.fileName = self.file_data.get('fileName')
             self.downloadUrl = self.file_data.get('downloadUrl')